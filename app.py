@@ -208,6 +208,7 @@ async def delete_pinecone_index_endpoint(
         index_name_to_delete = rag_pipeline_instance.vector_store.index_name
         print(f"Attempting to delete Pinecone index '{index_name_to_delete}' via API...")
         rag_pipeline_instance.vector_store.delete_index()
+        rag_pipeline_instance.invalidate_cached_results()
         if rag_pipeline_instance.vector_store:
             rag_pipeline_instance.vector_store.index = None
         return MessageResponse(message=f"Pinecone index '{index_name_to_delete}' has been deleted successfully.")
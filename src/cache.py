@@ -0,0 +1,389 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+from src.config import (
+    CACHE_BACKEND, CACHE_SQLITE_PATH, CACHE_REDIS_URL, CACHE_TTL_SECONDS,
+    CACHE_LOCK_TIMEOUT_SECONDS, CACHE_POLL_INTERVAL_SECONDS, CACHE_SQLITE_PURGE_EVERY
+)
+
+
+def make_cache_key(namespace, *parts):
+    """
+    Builds a compact cache key from a namespace and any JSON-serializable parts.
+    """
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    return f"rag:{namespace}:{digest}"
+
+
+def _is_not_none(value):
+    return value is not None
+
+
+class BaseCache:
+    """
+    Interface shared by all cache backends. Values must be JSON-serializable.
+    `add` only stores the value if the key is absent and `delete_if_equals` only
+    removes a key still holding the given value; the cross-worker locks in
+    `get_or_compute` rely on both being atomic.
+    """
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def add(self, key, value, ttl=None):
+        raise NotImplementedError
+
+    def delete(self, key):
+        raise NotImplementedError
+
+    def delete_if_equals(self, key, value):
+        raise NotImplementedError
+
+    def incr(self, key):
+        raise NotImplementedError
+
+    def _wait_for_value_or_lock(self, key, lock_key, token, lock_timeout, poll_interval):
+        """
+        Returns (value, lock_acquired). Either the value shows up (computed by
+        another worker) or this caller takes the lock; (None, False) on timeout.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value, False
+
+        deadline = time.time() + lock_timeout
+        while not self.add(lock_key, token, ttl=lock_timeout):
+            time.sleep(poll_interval)
+            value = self.get(key)
+            if value is not None:
+                return value, False
+            if time.time() >= deadline:
+                print(f"Timed out waiting for cache key '{key}', computing locally.")
+                return None, False
+
+        # Another worker may have finished between our miss and taking the lock.
+        return self.get(key), True
+
+    def get_or_compute(self, key, compute_fn, ttl=CACHE_TTL_SECONDS, should_cache=_is_not_none,
+                       lock_timeout=CACHE_LOCK_TIMEOUT_SECONDS,
+                       poll_interval=CACHE_POLL_INTERVAL_SECONDS):
+        """
+        Returns the cached value for `key`, computing it with `compute_fn` on a miss.
+        Concurrent misses for the same key (in any worker sharing this backend) are
+        coalesced: one caller computes while the others wait for its result.
+        The computed value is always returned, but only stored if `should_cache(value)`.
+        Backend errors are logged and the value is computed without the cache.
+        """
+        lock_key = f"{key}:lock"
+        token = uuid.uuid4().hex
+        try:
+            value, lock_acquired = self._wait_for_value_or_lock(key, lock_key, token, lock_timeout, poll_interval)
+        except Exception as e:
+            print(f"Cache backend error for key '{key}', computing without cache: {e}")
+            return compute_fn()
+
+        if value is not None:
+            if lock_acquired:
+                self._release_lock(lock_key, token)
+            return value
+        if not lock_acquired:
+            return compute_fn()
+
+        try:
+            value = compute_fn()
+            if should_cache(value):
+                try:
+                    self.set(key, value, ttl=ttl)
+                except Exception as e:
+                    print(f"Cache backend error storing key '{key}': {e}")
+            return value
+        finally:
+            self._release_lock(lock_key, token)
+
+    def _release_lock(self, lock_key, token):
+        # Only release our own lock: if it expired, another worker may hold it now.
+        try:
+            self.delete_if_equals(lock_key, token)
+        except Exception as e:
+            print(f"Cache backend error releasing lock '{lock_key}': {e}")
+
+
+class NullCache(BaseCache):
+    """Disables caching: every lookup misses and nothing is coalesced."""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl=None):
+        pass
+
+    def add(self, key, value, ttl=None):
+        return True
+
+    def delete(self, key):
+        pass
+
+    def delete_if_equals(self, key, value):
+        return False
+
+    def incr(self, key):
+        return 0
+
+
+class InMemoryCache(BaseCache):
+    """
+    Process-local stand-in with the same semantics as the shared backends.
+    Useful for tests and single-worker runs; not shared between workers.
+    """
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def _get_entry(self, key):
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._data[key]
+            return None
+        return entry
+
+    def get(self, key):
+        with self._lock:
+            entry = self._get_entry(key)
+            return entry[0] if entry else None
+
+    def set(self, key, value, ttl=None):
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl if ttl else None)
+
+    def add(self, key, value, ttl=None):
+        with self._lock:
+            if self._get_entry(key) is not None:
+                return False
+            self._data[key] = (value, time.time() + ttl if ttl else None)
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_if_equals(self, key, value):
+        with self._lock:
+            entry = self._get_entry(key)
+            if entry is None or entry[0] != value:
+                return False
+            del self._data[key]
+            return True
+
+    def incr(self, key):
+        with self._lock:
+            entry = self._get_entry(key)
+            value = (entry[0] if entry else 0) + 1
+            self._data[key] = (value, entry[1] if entry else None)
+            return value
+
+
+class SQLiteCache(BaseCache):
+    """
+    Default shared backend: a SQLite file that every worker on the host opens.
+    Writes go through `BEGIN IMMEDIATE` so `add`, `delete_if_equals` and `incr`
+    are atomic across processes. The connection is opened lazily and reopened
+    after a fork (e.g. `gunicorn --preload`), since SQLite connections must not
+    cross `fork()`. Expired rows are purged every `purge_every` writes.
+    """
+
+    def __init__(self, path=CACHE_SQLITE_PATH, purge_every=CACHE_SQLITE_PURGE_EVERY):
+        self.path = path
+        self.purge_every = purge_every
+        self._conn = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _connection(self):
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+        # First use, or we are in a forked child: never reuse the parent's connection.
+        self._lock = threading.Lock()
+        self._writes = 0
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS cache_expires_at ON cache (expires_at)")
+        self._conn = conn
+        self._pid = os.getpid()
+        return conn
+
+    def _write(self, statements):
+        conn = self._connection()
+        with self._lock:
+            cur = conn.cursor()
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(cur)
+                self._writes += 1
+                if self.purge_every and self._writes % self.purge_every == 0:
+                    self._purge_all_expired(cur)
+                cur.execute("COMMIT")
+                return result
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+
+    @staticmethod
+    def _expiry(ttl):
+        return time.time() + ttl if ttl else None
+
+    @staticmethod
+    def _purge_expired(cur, key):
+        cur.execute(
+            "DELETE FROM cache WHERE key = ? AND expires_at IS NOT NULL AND expires_at <= ?",
+            (key, time.time())
+        )
+
+    @staticmethod
+    def _purge_all_expired(cur):
+        cur.execute(
+            "DELETE FROM cache WHERE expires_at IS NOT NULL AND expires_at <= ?",
+            (time.time(),)
+        )
+
+    def purge_expired(self):
+        """Deletes every expired row."""
+        self._write(self._purge_all_expired)
+
+    def get(self, key):
+        conn = self._connection()
+        with self._lock:
+            row = conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if expires_at is not None and expires_at <= time.time():
+            return None
+        return json.loads(value)
+
+    def set(self, key, value, ttl=None):
+        self._write(lambda cur: cur.execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), self._expiry(ttl))
+        ))
+
+    def add(self, key, value, ttl=None):
+        def statements(cur):
+            self._purge_expired(cur, key)
+            cur.execute(
+                "INSERT OR IGNORE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), self._expiry(ttl))
+            )
+            return cur.rowcount == 1
+        return self._write(statements)
+
+    def delete(self, key):
+        self._write(lambda cur: cur.execute("DELETE FROM cache WHERE key = ?", (key,)))
+
+    def delete_if_equals(self, key, value):
+        def statements(cur):
+            cur.execute("DELETE FROM cache WHERE key = ? AND value = ?", (key, json.dumps(value)))
+            return cur.rowcount == 1
+        return self._write(statements)
+
+    def incr(self, key):
+        def statements(cur):
+            self._purge_expired(cur, key)
+            row = cur.execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+            value = (json.loads(row[0]) if row else 0) + 1
+            cur.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, NULL)",
+                (key, json.dumps(value))
+            )
+            return value
+        return self._write(statements)
+
+
+class RedisCache(BaseCache):
+    """
+    Optional backend for any Redis-protocol server (Redis, Valkey, KeyDB, ...).
+    Requires the `redis` package.
+    """
+
+    _DELETE_IF_EQUALS_SCRIPT = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('DEL', KEYS[1])
+    end
+    return 0
+    """
+
+    def __init__(self, url=CACHE_REDIS_URL):
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError("CACHE_BACKEND=redis requires the 'redis' package: pip install redis") from e
+        self.client = redis.Redis.from_url(url)
+        self._delete_if_equals = self.client.register_script(self._DELETE_IF_EQUALS_SCRIPT)
+
+    @staticmethod
+    def _ttl_ms(ttl):
+        return max(1, int(ttl * 1000)) if ttl else None
+
+    def get(self, key):
+        value = self.client.get(key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value, ttl=None):
+        self.client.set(key, json.dumps(value), px=self._ttl_ms(ttl))
+
+    def add(self, key, value, ttl=None):
+        return bool(self.client.set(key, json.dumps(value), px=self._ttl_ms(ttl), nx=True))
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def delete_if_equals(self, key, value):
+        return bool(self._delete_if_equals(keys=[key], args=[json.dumps(value)]))
+
+    def incr(self, key):
+        return self.client.incr(key)
+
+
+def get_cache_backend(backend=CACHE_BACKEND):
+    """
+    Creates the cache backend selected by CACHE_BACKEND: "sqlite" (default),
+    "redis", "memory" or "none". Falls back to no caching if it cannot be built.
+    """
+    backend = (backend or "sqlite").lower()
+    backends = {
+        "sqlite": SQLiteCache,
+        "redis": RedisCache,
+        "memory": InMemoryCache,
+        "none": NullCache,
+    }
+    if backend not in backends:
+        print(f"Warning: unknown CACHE_BACKEND '{backend}', caching disabled. "
+              f"Use 'sqlite', 'redis', 'memory' or 'none'.")
+        return NullCache()
+    try:
+        return backends[backend]()
+    except Exception as e:
+        print(f"Warning: could not create '{backend}' cache backend, caching disabled: {e}")
+        return NullCache()
@@ -19,4 +19,14 @@ CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 100
 
 # -- RAG Configuration --
-TOP_K_RESULTS = 5
\ No newline at end of file
+TOP_K_RESULTS = 5
+
+# -- Cache Configuration --
+# Shared by all workers: "sqlite" (default, one file per host), "redis", "memory" (per process) or "none".
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "sqlite")
+CACHE_SQLITE_PATH = os.getenv("CACHE_SQLITE_PATH", ".cache/rag_cache.sqlite3")
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "86400"))
+CACHE_LOCK_TIMEOUT_SECONDS = 60
+CACHE_POLL_INTERVAL_SECONDS = 0.1
+CACHE_SQLITE_PURGE_EVERY = 100
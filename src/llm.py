@@ -3,6 +3,8 @@ from src.config import GOOGLE_API_KEY, GEMINI_GENERATION_MODEL
 
 genai.configure(api_key=GOOGLE_API_KEY)
 
+GENERATION_ERROR_MESSAGE = "Xin lỗi, tôi gặp sự cố khi tạo câu trả lời."
+
 class GeminiLLMHandler:
     def __init__(self, model_name=GEMINI_GENERATION_MODEL):
         self.model = genai.GenerativeModel(model_name)
@@ -28,7 +30,7 @@ class GeminiLLMHandler:
             return response.text
         except Exception as e:
             print(f"Error generating answer with Gemini: {e}")
-            return "Xin lỗi, tôi gặp sự cố khi tạo câu trả lời."
+            return GENERATION_ERROR_MESSAGE
 
 
 if __name__ == '__main__':
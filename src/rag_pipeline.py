@@ -1,14 +1,24 @@
 from src.document_processor import load_documents_from_directory, split_text_into_chunks
 from src.embedding_client import GeminiEmbeddingClient
 from src.vector_store import PineconeVectorStore
-from src.llm import GeminiLLMHandler
+from src.llm import GeminiLLMHandler, GENERATION_ERROR_MESSAGE
+from src.cache import get_cache_backend, make_cache_key
 from src.config import (
     CHUNK_SIZE, CHUNK_OVERLAP, TOP_K_RESULTS,
-    PINECONE_API_KEY, PINECONE_ENVIRONMENT, PINECONE_INDEX_NAME, PINECONE_VECTOR_DIMENSION
+    PINECONE_API_KEY, PINECONE_ENVIRONMENT, PINECONE_INDEX_NAME, PINECONE_VECTOR_DIMENSION,
+    GEMINI_GENERATION_MODEL
 )
 import os
 from tqdm import tqdm
 
+EMBEDDING_ERROR_MESSAGE = "Xin lỗi, tôi không thể xử lý câu hỏi của bạn vào lúc này (lỗi embedding)."
+NO_MATCHES_MESSAGE = "Xin lỗi, tôi không tìm thấy thông tin liên quan trong tài liệu để trả lời câu hỏi của bạn."
+NO_CONTEXT_MESSAGE = "Xin lỗi, tôi đã tìm thấy các mục liên quan nhưng không thể trích xuất nội dung để trả lời."
+# Fallback answers are never cached, so a transient failure is retried on the next query.
+UNCACHEABLE_ANSWERS = {
+    EMBEDDING_ERROR_MESSAGE, NO_MATCHES_MESSAGE, NO_CONTEXT_MESSAGE, GENERATION_ERROR_MESSAGE
+}
+
 class RAGPipeline:
     def __init__(self):
         self.embedding_client = GeminiEmbeddingClient()
@@ -18,6 +28,32 @@ class RAGPipeline:
             dimension=PINECONE_VECTOR_DIMENSION
         )
         self.llm_handler = GeminiLLMHandler()
+        self.cache = get_cache_backend()
+
+    @property
+    def index_version_key(self):
+        return f"rag:index_version:{self.vector_store.index_name}"
+
+    def get_index_version(self):
+        """Returns the shared index version, or None if the cache backend is unavailable."""
+        try:
+            return self.cache.get(self.index_version_key) or 0
+        except Exception as e:
+            print(f"Cache backend error reading index version, skipping result caches: {e}")
+            return None
+
+    def invalidate_cached_results(self):
+        """
+        Bumps the shared index version so every worker stops serving retrievals
+        and answers computed against the previous index contents.
+        """
+        try:
+            version = self.cache.incr(self.index_version_key)
+        except Exception as e:
+            print(f"Warning: could not bump index version, cached results may be stale: {e}")
+            return None
+        print(f"Index version bumped to {version}; cached retrievals and answers invalidated.")
+        return version
 
     def process_and_index_documents(self, documents_path="data/"):
         """
@@ -70,49 +106,95 @@ class RAGPipeline:
 
         print(f"Upserting {len(vectors_to_upsert)} vectors to Pinecone...")
         self.vector_store.upsert_vectors(vectors_to_upsert, batch_size=100) # Pinecone có thể xử lý batch lớn hơn
+        self.invalidate_cached_results()
         print("Document processing and indexing complete.")
         print(f"Pinecone index stats: {self.vector_store.index.describe_index_stats()}")
 
 
-    def query(self, user_question):
+    def _embed_question(self, user_question):
+        """Embeds the question, sharing the result with other workers through the cache."""
+        model_name = self.embedding_client.model_name
+        key = make_cache_key("embedding", model_name, "RETRIEVAL_QUERY", user_question)
+        return self.cache.get_or_compute(
+            key, lambda: self.embedding_client.get_embedding(user_question, task_type="RETRIEVAL_QUERY")
+        )
+
+    def _retrieve_matches(self, user_question, index_version):
         """
-        Takes a user question, retrieves relevant context, and generates an answer.
+        Retrieves the top matches for the question as plain dicts so they can be cached.
+        Results are keyed by index version, so re-indexing invalidates them; with no
+        index version (cache unavailable) they are not cached at all.
+        Returns None if the question could not be embedded, [] if nothing matched.
         """
-        print(f"\nUser question: {user_question}")
-
-        # 1. Embed the user question
-        print("Embedding user question...")
-        query_embedding = self.embedding_client.get_embedding(user_question, task_type="RETRIEVAL_QUERY")
-        if not query_embedding:
-            return "Xin lỗi, tôi không thể xử lý câu hỏi của bạn vào lúc này (lỗi embedding)."
-
-        # 2. Retrieve relevant chunks from Pinecone
-        print(f"Retrieving top-{TOP_K_RESULTS} relevant documents from Pinecone...")
-        retrieved_matches = self.vector_store.query_vectors(query_embedding, top_k=TOP_K_RESULTS)
+        def compute():
+            # 1. Embed the user question
+            print("Embedding user question...")
+            query_embedding = self._embed_question(user_question)
+            if not query_embedding:
+                return None
+
+            # 2. Retrieve relevant chunks from Pinecone
+            print(f"Retrieving top-{TOP_K_RESULTS} relevant documents from Pinecone...")
+            retrieved_matches = self.vector_store.query_vectors(query_embedding, top_k=TOP_K_RESULTS)
+            return [
+                {"id": match.id, "score": match.score, "metadata": dict(match.metadata or {})}
+                for match in retrieved_matches or []
+            ]
+
+        if index_version is None:
+            return compute()
+        key = make_cache_key("retrieval", self.vector_store.index_name, index_version, TOP_K_RESULTS, user_question)
+        # Empty results may be a Pinecone error, so only non-empty matches are cached.
+        return self.cache.get_or_compute(key, compute, should_cache=bool)
+
+    def _generate_answer(self, user_question, index_version):
+        """
+        Runs retrieval and generation for a question.
+        """
+        retrieved_matches = self._retrieve_matches(user_question, index_version)
+        if retrieved_matches is None:
+            return EMBEDDING_ERROR_MESSAGE
 
         if not retrieved_matches:
-            return "Xin lỗi, tôi không tìm thấy thông tin liên quan trong tài liệu để trả lời câu hỏi của bạn."
+            return NO_MATCHES_MESSAGE
 
         # 3. Format context for LLM
         context_parts = []
         print("\n---Retrieved Context Chunks---")
         for i, match in enumerate(retrieved_matches):
-            if 'metadata' in match and 'text_chunk' in match.metadata:
-                text = match.metadata['text_chunk']
-                source = match.metadata.get('source', 'N/A')
-                score = match.score
+            if 'text_chunk' in match['metadata']:
+                text = match['metadata']['text_chunk']
+                source = match['metadata'].get('source', 'N/A')
+                score = match['score']
                 print(f"Chunk {i+1} (Source: {source}, Score: {score:.4f}):\n{text[:200]}...") # In ra 200 ký tự đầu
                 context_parts.append(text)
             else:
-                 print(f"Chunk {i+1} (ID: {match.id}) metadata missing text_chunk.")
+                 print(f"Chunk {i+1} (ID: {match['id']}) metadata missing text_chunk.")
 
 
         if not context_parts:
-            return "Xin lỗi, tôi đã tìm thấy các mục liên quan nhưng không thể trích xuất nội dung để trả lời."
+            return NO_CONTEXT_MESSAGE
 
         context_for_llm = "\n\n---\n\n".join(context_parts)
 
         # 4. Generate answer using LLM
         print("\nGenerating answer with LLM...")
-        answer = self.llm_handler.generate_answer(user_question, context_for_llm)
-        return answer
\ No newline at end of file
+        return self.llm_handler.generate_answer(user_question, context_for_llm)
+
+    def query(self, user_question):
+        """
+        Takes a user question, retrieves relevant context, and generates an answer.
+        Embeddings, retrievals and answers are cached in the shared cache backend, and
+        concurrent identical questions across workers trigger a single Gemini call.
+        """
+        print(f"\nUser question: {user_question}")
+        user_question = user_question.strip()
+        index_version = self.get_index_version()
+        if index_version is None:
+            return self._generate_answer(user_question, index_version)
+
+        key = make_cache_key("answer", self.vector_store.index_name, index_version, GEMINI_GENERATION_MODEL, user_question)
+        return self.cache.get_or_compute(
+            key, lambda: self._generate_answer(user_question, index_version),
+            should_cache=lambda answer: answer is not None and answer not in UNCACHEABLE_ANSWERS
+        )
@@ -0,0 +1,103 @@
+import multiprocessing
+import sqlite3
+import time
+
+from src.cache import InMemoryCache, NullCache, SQLiteCache, get_cache_backend
+
+
+def _compute_shared(path, calls, results):
+    cache = SQLiteCache(path)
+
+    def compute():
+        with calls.get_lock():
+            calls.value += 1
+        time.sleep(0.5)
+        return "answer"
+
+    results.put(cache.get_or_compute("question", compute, poll_interval=0.01))
+
+
+def test_sqlite_get_or_compute_coalesces_across_processes(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    calls = multiprocessing.Value("i", 0)
+    results = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(target=_compute_shared, args=(path, calls, results))
+        for _ in range(8)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(timeout=30)
+
+    assert [results.get(timeout=5) for _ in workers] == ["answer"] * 8
+    assert calls.value == 1
+
+
+def test_sqlite_purges_expired_rows_on_writes(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache = SQLiteCache(path, purge_every=3)
+    cache.set("old", "value", ttl=0.01)
+    time.sleep(0.02)
+    cache.set("a", 1)
+    cache.set("b", 2)
+
+    keys = {row[0] for row in sqlite3.connect(path).execute("SELECT key FROM cache")}
+    assert keys == {"a", "b"}
+
+
+def test_sqlite_reopens_connection_in_new_process(tmp_path):
+    cache = SQLiteCache(str(tmp_path / "cache.sqlite3"))
+    cache.set("key", "value")
+    cache._pid = -1  # as if this object had been inherited through fork()
+    parent_conn = cache._conn
+
+    assert cache.get("key") == "value"
+    assert cache._conn is not parent_conn
+
+
+def test_in_memory_add_incr_and_ttl():
+    cache = InMemoryCache()
+    assert cache.add("lock", "a", ttl=0.05)
+    assert not cache.add("lock", "b")
+    time.sleep(0.06)
+    assert cache.get("lock") is None
+    assert cache.add("lock", "b")
+
+    assert cache.incr("version") == 1
+    assert cache.incr("version") == 2
+
+    cache.set("short", "value", ttl=0.01)
+    cache.set("forever", "value")
+    time.sleep(0.02)
+    assert cache.get("short") is None
+    assert cache.get("forever") == "value"
+
+
+def test_lock_release_only_removes_own_token():
+    cache = InMemoryCache()
+    cache.add("key:lock", "other-worker")
+    assert not cache.delete_if_equals("key:lock", "expired-owner")
+    assert cache.get("key:lock") == "other-worker"
+    assert cache.delete_if_equals("key:lock", "other-worker")
+
+
+def test_get_or_compute_respects_should_cache():
+    cache = InMemoryCache()
+    assert cache.get_or_compute("key", lambda: [], should_cache=bool) == []
+    assert cache.get("key") is None
+    assert cache.get_or_compute("key", lambda: [1], should_cache=bool) == [1]
+    assert cache.get_or_compute("key", lambda: [2], should_cache=bool) == [1]
+
+
+def test_get_or_compute_falls_back_when_backend_fails():
+    class BrokenCache(InMemoryCache):
+        def get(self, key):
+            raise sqlite3.OperationalError("database is locked")
+
+    assert BrokenCache().get_or_compute("key", lambda: "computed") == "computed"
+
+
+def test_get_cache_backend_falls_back_to_null_cache():
+    assert isinstance(get_cache_backend("memory"), InMemoryCache)
+    assert isinstance(get_cache_backend("unknown"), NullCache)
@@ -0,0 +1,97 @@
+from types import SimpleNamespace
+
+import pytest
+
+from src.cache import InMemoryCache
+from src.llm import GENERATION_ERROR_MESSAGE
+from src.rag_pipeline import NO_MATCHES_MESSAGE, RAGPipeline
+
+
+class StubEmbeddingClient:
+    model_name = "stub-embedding"
+
+    def __init__(self):
+        self.calls = 0
+
+    def get_embedding(self, text, task_type="RETRIEVAL_QUERY", title=None):
+        self.calls += 1
+        return [0.1, 0.2, 0.3]
+
+
+class StubVectorStore:
+    index_name = "stub-index"
+
+    def __init__(self, matches):
+        self.matches = matches
+        self.calls = 0
+
+    def query_vectors(self, query_vector, top_k=5, filter_criteria=None):
+        self.calls += 1
+        return self.matches
+
+
+class StubLLMHandler:
+    def __init__(self, answer="RAG is retrieval augmented generation."):
+        self.answer = answer
+        self.calls = 0
+
+    def generate_answer(self, question, context):
+        self.calls += 1
+        return self.answer
+
+
+def _match(text):
+    return SimpleNamespace(id="doc_chunk_0", score=0.9, metadata={"text_chunk": text, "source": "doc.txt"})
+
+
+@pytest.fixture
+def make_pipeline():
+    def make(matches=None, answer="RAG is retrieval augmented generation."):
+        pipeline = RAGPipeline.__new__(RAGPipeline)
+        pipeline.embedding_client = StubEmbeddingClient()
+        pipeline.vector_store = StubVectorStore([_match("RAG combines retrieval and generation.")] if matches is None else matches)
+        pipeline.llm_handler = StubLLMHandler(answer)
+        pipeline.cache = InMemoryCache()
+        return pipeline
+    return make
+
+
+def test_repeat_question_is_served_from_cache(make_pipeline):
+    pipeline = make_pipeline()
+    first = pipeline.query("What is RAG?")
+    second = pipeline.query("  What is RAG?  ")
+
+    assert first == second == "RAG is retrieval augmented generation."
+    assert pipeline.embedding_client.calls == 1
+    assert pipeline.vector_store.calls == 1
+    assert pipeline.llm_handler.calls == 1
+
+
+def test_invalidate_cached_results_forces_recomputation(make_pipeline):
+    pipeline = make_pipeline()
+    pipeline.query("What is RAG?")
+    pipeline.invalidate_cached_results()
+    pipeline.query("What is RAG?")
+
+    assert pipeline.vector_store.calls == 2
+    assert pipeline.llm_handler.calls == 2
+    # The question embedding does not depend on the index, so it stays cached.
+    assert pipeline.embedding_client.calls == 1
+
+
+def test_generation_error_is_not_cached(make_pipeline):
+    pipeline = make_pipeline(answer=GENERATION_ERROR_MESSAGE)
+    assert pipeline.query("What is RAG?") == GENERATION_ERROR_MESSAGE
+    pipeline.llm_handler.answer = "Recovered answer."
+
+    assert pipeline.query("What is RAG?") == "Recovered answer."
+    assert pipeline.llm_handler.calls == 2
+
+
+def test_no_match_fallback_is_not_cached(make_pipeline):
+    pipeline = make_pipeline(matches=[])
+    assert pipeline.query("What is RAG?") == NO_MATCHES_MESSAGE
+    pipeline.vector_store.matches = [_match("RAG combines retrieval and generation.")]
+
+    assert pipeline.query("What is RAG?") == "RAG is retrieval augmented generation."
+    assert pipeline.vector_store.calls == 2